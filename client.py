@@ -1,44 +1,190 @@
 import asyncio
+import atexit
+import os
 import aiohttp
+import orjson
 import typer
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
-from rich.progress import Progress
-from typing import Optional, List
+from typing import AsyncGenerator, Dict, Optional, List, Tuple
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 
 app = typer.Typer()
 console = Console()
 
+# Shared timeout applied to every request made by the client session
+CLIENT_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=3)
+
+# Symbols sent per /stocks request and the cap on concurrent requests
+BATCH_SIZE = 50
+MAX_CONCURRENT_REQUESTS = 32
+
+# Column layout for Parquet exports from the watch command
+EXPORT_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us')),
+    ('symbol', pa.string()),
+    ('price', pa.float64()),
+    ('volume', pa.float64()),
+    ('market_cap', pa.float64()),
+    ('fifty_day_avg', pa.float64())
+])
+
+# Shared client session per event loop, paired with the async generator that
+# closes it when the loop shuts down its async generators (asyncio.run/Runner)
+_sessions: Dict[asyncio.AbstractEventLoop, Tuple[aiohttp.ClientSession, AsyncGenerator]] = {}
+
+async def _session_closer(loop: asyncio.AbstractEventLoop, session: aiohttp.ClientSession):
+    try:
+        yield
+    finally:
+        if _sessions.get(loop, (None, None))[0] is session:
+            del _sessions[loop]
+        if not session.closed:
+            await session.close()
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the running loop's shared client session, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    entry = _sessions.get(loop)
+    if entry is not None and not entry[0].closed:
+        return entry[0]
+
+    # All requests go to one host, so size the pool per host to the most
+    # requests get_multiple_stocks keeps in flight
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        limit_per_host=MAX_CONCURRENT_REQUESTS,
+        keepalive_timeout=120,
+        ttl_dns_cache=300
+    )
+    session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=CLIENT_TIMEOUT,
+        json_serialize=lambda obj: orjson.dumps(obj).decode()
+    )
+    # Starting the generator registers it with the loop's async generator hooks
+    closer = _session_closer(loop, session)
+    await closer.__anext__()
+    _sessions[loop] = (session, closer)
+    return session
+
+async def close_session():
+    """Close the running loop's shared client session if one is open"""
+    entry = _sessions.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+@atexit.register
+def _close_sessions_at_exit():
+    # Loops driven by hand may never shut down their async generators
+    for loop, (session, closer) in list(_sessions.items()):
+        if not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(closer.aclose())
+
 class StockClient:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
         self.session = None
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = await get_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        # The shared session outlives the client and is reused by the next one
+        self.session = None
 
     async def get_stock_info(self, symbol: str) -> dict:
         async with self.session.post(
             f"{self.base_url}/stock",
             json={"symbol": symbol}
         ) as response:
-            return await response.json()
+            return orjson.loads(await response.read())
+
+    async def get_stock_batch(self, symbols: List[str]) -> List[dict]:
+        async with self.session.post(
+            f"{self.base_url}/stocks",
+            json={"symbols": symbols}
+        ) as response:
+            return orjson.loads(await response.read())
 
     async def get_multiple_stocks(self, symbols: List[str]) -> List[dict]:
-        tasks = [self.get_stock_info(symbol) for symbol in symbols]
-        return await asyncio.gather(*tasks)
+        # Split large watchlists into batches and bound the requests in flight
+        sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        async def bounded(batch: List[str]) -> List[dict]:
+            async with sem:
+                return await self.get_stock_batch(batch)
+
+        batches = [symbols[i:i + BATCH_SIZE] for i in range(0, len(symbols), BATCH_SIZE)]
+        results = await asyncio.gather(*(bounded(batch) for batch in batches))
+        return [stock for batch in results for stock in batch]
 
+def run_async(coro):
+    """Run a coroutine on a fresh event loop using the eager task factory"""
+    # Runner keeps asyncio.run's Ctrl-C handling: the main task is cancelled
+    # so its cleanup runs before KeyboardInterrupt is raised here
+    with asyncio.Runner() as runner:
+        runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+        try:
+            return runner.run(coro)
+        finally:
+            runner.run(close_session())
+
+def _as_float(value) -> float:
+    return np.nan if value is None else value
+
+@lru_cache(maxsize=4096)
 def format_currency(value: float) -> str:
     return f"${value:,.2f}" if value else "N/A"
 
-def create_stock_table(data: List[dict]) -> Table:
+# Numeric fields in a stock response, in column order
+_numeric_fields = itemgetter('current_price', 'volume', 'market_cap', 'fifty_day_average')
+
+def stock_columns(data: List[dict]) -> Dict[str, np.ndarray]:
+    """Gather stock responses into one array per field, NaN where missing"""
+    count = len(data)
+    symbol_col = np.empty(count, dtype=object)
+    price_col = np.empty(count, dtype=np.float64)
+    volume_col = np.empty(count, dtype=np.float64)
+    market_cap_col = np.empty(count, dtype=np.float64)
+    fifty_day_avg_col = np.empty(count, dtype=np.float64)
+
+    for i, stock in enumerate(data):
+        price, volume, market_cap, fifty_day_avg = _numeric_fields(stock['data'])
+        symbol_col[i] = stock['symbol']
+        price_col[i] = _as_float(price)
+        volume_col[i] = _as_float(volume)
+        market_cap_col[i] = _as_float(market_cap)
+        fifty_day_avg_col[i] = _as_float(fifty_day_avg)
+
+    return {
+        'symbol': symbol_col,
+        'price': price_col,
+        'volume': volume_col,
+        'market_cap': market_cap_col,
+        'fifty_day_avg': fifty_day_avg_col
+    }
+
+def _format_column(values: np.ndarray, formatter) -> List[str]:
+    # Missing and zero values are masked in one pass and shown as N/A
+    missing = np.isnan(values) | (values == 0)
+    return [
+        "N/A" if skip else formatter(value)
+        for value, skip in zip(values.tolist(), missing.tolist())
+    ]
+
+def _format_volume(value: float) -> str:
+    return f"{int(value):,}"
+
+def create_stock_table(columns: Dict[str, np.ndarray]) -> Table:
     table = Table(show_header=True, header_style="bold magenta")
     table.add_column("Symbol")
     table.add_column("Current Price")
@@ -46,74 +192,80 @@ def create_stock_table(data: List[dict]) -> Table:
     table.add_column("Market Cap")
     table.add_column("50 Day Avg")
 
-    for stock in data:
-        symbol = stock['symbol']
-        stock_data = stock['data']
-        
-        table.add_row(
-            symbol,
-            format_currency(stock_data.get('current_price')),
-            f"{stock_data.get('volume'):,}" if stock_data.get('volume') else "N/A",
-            format_currency(stock_data.get('market_cap')),
-            format_currency(stock_data.get('fifty_day_average'))
-        )
+    rows = zip(
+        columns['symbol'].tolist(),
+        _format_column(columns['price'], format_currency),
+        _format_column(columns['volume'], _format_volume),
+        _format_column(columns['market_cap'], format_currency),
+        _format_column(columns['fifty_day_avg'], format_currency)
+    )
+    for row in rows:
+        table.add_row(*row)
     
     return table
 
 @app.command()
 def watch(symbols: List[str] = typer.Argument(..., help="Stock symbols to watch"),
           interval: int = typer.Option(60, help="Refresh interval in seconds"),
-          output: str = typer.Option(None, help="Output file for CSV export")):
+          output: str = typer.Option(None, help="Output file for export: .parquet writes a new Parquet file (refuses to overwrite), anything else appends CSV")):
     """
     Watch Canadian stock prices in real-time with periodic updates
     """
     async def watch_stocks():
-        df_list = []
+        export_file = None
+        parquet_writer = None
+        write_header = False
         try:
-            while True:
-                async with StockClient() as client:
-                    with Progress() as progress:
-                        task = progress.add_task("[cyan]Fetching stock data...", total=len(symbols))
-                        
-                        stock_data = await client.get_multiple_stocks(symbols)
-                        progress.update(task, advance=len(symbols))
+            # Opened inside the try so bad paths report like any other error
+            if output and output.endswith('.parquet'):
+                # A Parquet file cannot be appended to, so never truncate one
+                if os.path.exists(output) and os.path.getsize(output) > 0:
+                    raise FileExistsError(f"{output} already exists; Parquet exports are not appended to")
+                parquet_writer = pq.ParquetWriter(output, EXPORT_SCHEMA, compression='zstd')
+            elif output:
+                write_header = not os.path.exists(output) or os.path.getsize(output) == 0
+                export_file = open(output, 'a', buffering=1 << 20, newline='')
+            if output:
+                console.print(f"Exporting data to {output}")
 
-                    console.clear()
-                    console.print(create_stock_table(stock_data))
+            async with StockClient() as client:
+                # Redraw only when a new table arrives, once per interval
+                with Live(create_stock_table(stock_columns([])), auto_refresh=False, console=console) as live:
+                    while True:
+                        stock_data = await client.get_multiple_stocks(symbols)
+                        columns = stock_columns(stock_data)
+                        live.update(create_stock_table(columns), refresh=True)
                     
-                    if output:
-                        # Create DataFrame for export
-                        current_data = {
-                            'timestamp': datetime.now(),
-                            'symbol': [],
-                            'price': [],
-                            'volume': [],
-                            'market_cap': [],
-                            'fifty_day_avg': []
-                        }
-                        
-                        for stock in stock_data:
-                            current_data['symbol'].append(stock['symbol'])
-                            current_data['price'].append(stock['data'].get('current_price'))
-                            current_data['volume'].append(stock['data'].get('volume'))
-                            current_data['market_cap'].append(stock['data'].get('market_cap'))
-                            current_data['fifty_day_avg'].append(stock['data'].get('fifty_day_average'))
-                        
-                        df = pd.DataFrame(current_data)
-                        df_list.append(df)
+                        if output:
+                            df = pd.DataFrame({'timestamp': datetime.now(), **columns}, copy=False)
                         
-                        # Export to CSV
-                        pd.concat(df_list).to_csv(output, index=False)
-                        console.print(f"\nData exported to {output}")
+                            if parquet_writer:
+                                # Stream this interval's rows as one Parquet row group
+                                batch = pa.RecordBatch.from_pandas(df, schema=EXPORT_SCHEMA, preserve_index=False)
+                                parquet_writer.write_batch(batch)
+                            else:
+                                # Append this interval's rows to the CSV
+                                df.to_csv(export_file, header=write_header, index=False)
+                                export_file.flush()
+                                write_header = False
 
-                await asyncio.sleep(interval)
+                        await asyncio.sleep(interval)
                 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             console.print("\n[yellow]Stopping stock watch...[/yellow]")
         except Exception as e:
             console.print(f"\n[red]Error: {str(e)}[/red]")
+        finally:
+            if parquet_writer:
+                parquet_writer.close()
+            if export_file:
+                export_file.close()
 
-    asyncio.run(watch_stocks())
+    try:
+        run_async(watch_stocks())
+    except KeyboardInterrupt:
+        # Ctrl-C is how watch stops; cleanup already ran in watch_stocks
+        pass
 
 @app.command()
 def analyze(symbol: str = typer.Argument(..., help="Stock symbol to analyze"),
@@ -166,7 +318,7 @@ def analyze(symbol: str = typer.Argument(..., help="Stock symbol to analyze"),
             except Exception as e:
                 console.print(f"[red]Error analyzing {symbol}: {str(e)}[/red]")
 
-    asyncio.run(analyze_stock())
+    run_async(analyze_stock())
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -1,16 +1,29 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel
 import yfinance as yf
 import uvicorn
 import asyncio
-from typing import Dict, Optional
+import hashlib
+import orjson
+import os
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upstream quotes are cached for this many seconds per symbol
+CACHE_TTL = 60
+
+# Limit simultaneous upstream yfinance calls running in worker threads
+UPSTREAM_CONCURRENCY = 16
+upstream_semaphore = asyncio.Semaphore(UPSTREAM_CONCURRENCY)
+
 # FastAPI app initialization
 app = FastAPI(title="Stock Market API")
 
@@ -26,43 +39,118 @@ app.add_middleware(
 class StockRequest(BaseModel):
     symbol: str
 
+class StocksRequest(BaseModel):
+    symbols: List[str]
+
+class StockData(BaseModel):
+    current_price: Optional[float] = None
+    volume: Optional[int] = None
+    market_cap: Optional[float] = None
+    fifty_day_average: Optional[float] = None
+    name: Optional[str] = None
+    currency: str = "CAD"
+
 class StockResponse(BaseModel):
     symbol: str
-    data: Dict
+    data: StockData
+
+@lru_cache(maxsize=256)
+def _fetch_info(symbol: str, bucket: int) -> Dict:
+    """Fetch ticker info, memoized per symbol and TTL time bucket"""
+    return yf.Ticker(symbol).info
+
+@lru_cache(maxsize=1024)
+def _normalize_symbol(symbol: str) -> str:
+    # yfinance uppercases tickers, so match it for consistent cache keys
+    symbol = symbol.upper()
+    # Add .TO suffix for Canadian stocks if not present
+    if not symbol.endswith('.TO'):
+        symbol = f"{symbol}.TO"
+    return symbol
+
+def _extract_stock_data(info: Dict) -> Dict:
+    return {
+        "current_price": info.get("currentPrice"),
+        "volume": info.get("volume"),
+        "market_cap": info.get("marketCap"),
+        "fifty_day_average": info.get("fiftyDayAverage"),
+        "name": info.get("longName"),
+        "currency": info.get("currency") or "CAD"
+    }
+
+@lru_cache(maxsize=256)
+def _encode_stock_response(symbol: str, bucket: int) -> Tuple[str, bytes]:
+    """Serialize the /stock response once per symbol and TTL time bucket"""
+    info = _fetch_info(_normalize_symbol(symbol), bucket)
+    # Delisted or unknown tickers come back empty; answer with nulls
+    data = StockData(**_extract_stock_data(info)) if info else StockData()
+    body = orjson.dumps(StockResponse(symbol=symbol, data=data).model_dump())
+    etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    return etag, body
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak ETag comparison against an If-None-Match header, including *"""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == opaque for tag in tags)
 
-async def get_stock_data(symbol: str) -> Dict:
+async def get_stock_response(symbol: str) -> Tuple[str, bytes]:
     try:
-        # Add .TO suffix for Canadian stocks if not present
-        if not symbol.endswith('.TO'):
-            symbol = f"{symbol}.TO"
-        
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        
-        return {
-            "current_price": info.get("currentPrice"),
-            "volume": info.get("volume"),
-            "market_cap": info.get("marketCap"),
-            "fifty_day_average": info.get("fiftyDayAverage"),
-            "name": info.get("longName"),
-            "currency": info.get("currency", "CAD")
-        }
+        bucket = int(time.time() // CACHE_TTL)
+        async with upstream_semaphore:
+            return await asyncio.to_thread(_encode_stock_response, symbol, bucket)
     except Exception as e:
         logger.error(f"Error fetching data for {symbol}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching stock data: {str(e)}")
 
+async def get_symbol_stock_data(symbol: str, bucket: int) -> StockData:
+    try:
+        normalized = _normalize_symbol(symbol)
+        async with upstream_semaphore:
+            info = await asyncio.to_thread(_fetch_info, normalized, bucket)
+        return StockData(**_extract_stock_data(info))
+    except Exception as e:
+        # One bad symbol should not fail the whole batch; answer it with nulls
+        logger.error(f"Error fetching data for {symbol}: {str(e)}")
+        return StockData()
+
+async def get_multiple_stock_data(symbols: List[str]) -> List[StockData]:
+    bucket = int(time.time() // CACHE_TTL)
+    return await asyncio.gather(
+        *(get_symbol_stock_data(symbol, bucket) for symbol in symbols)
+    )
+
 @app.get("/")
 async def root():
     return {"status": "online", "message": "Stock Market API is running"}
 
 @app.post("/stock", response_model=StockResponse)
-async def get_stock_info(request: StockRequest):
-    try:
-        data = await get_stock_data(request.symbol)
-        return StockResponse(symbol=request.symbol, data=data)
-    except Exception as e:
-        logger.error(f"Error processing request for {request.symbol}: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_stock_info(request: StockRequest, if_none_match: Optional[str] = Header(None)):
+    etag, body = await get_stock_response(request.symbol)
+    if if_none_match and _etag_matches(if_none_match, etag):
+        # RFC 9110 answers a failed If-None-Match with 304 only for GET/HEAD;
+        # other methods such as this POST get 412 Precondition Failed
+        return Response(status_code=412, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+@app.post("/stocks", response_model=List[StockResponse])
+async def get_stocks_info(request: StocksRequest):
+    data = await get_multiple_stock_data(request.symbols)
+    return [
+        StockResponse(symbol=symbol, data=stock_data)
+        for symbol, stock_data in zip(request.symbols, data)
+    ]
+
+@app.get("/cache")
+async def cache_info():
+    """Report hit/miss statistics for the upstream quote caches"""
+    return {
+        "ttl": CACHE_TTL,
+        "stock": _fetch_info.cache_info()._asdict(),
+        "encoded": _encode_stock_response.cache_info()._asdict()
+    }
 
 @app.get("/health")
 async def health_check():
@@ -71,7 +159,17 @@ async def health_check():
 def start_server():
     """Function to start the server"""
     try:
-        uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+        # Each worker is a separate process with its own quote caches.
+        # loop/http "auto" pick uvloop and httptools when they are installed.
+        uvicorn.run(
+            "server:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=os.cpu_count() or 1,
+            loop="auto",
+            http="auto",
+            log_level="info"
+        )
     except Exception as e:
         logger.error(f"Failed to start server: {str(e)}")
         raise